@@ -9,8 +9,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'env_dev.settings')
 
+from score import buttons, hardware
 from score.routing import urlpatterns
 
+# The server owns the display and button pins unless displayd does
+if not hardware.daemon_mode:
+    hardware.start()
+    buttons.start()
+
 application = ProtocolTypeRouter({
     'http': get_asgi_application(),
     'websocket': URLRouter(urlpatterns),
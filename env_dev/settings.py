@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,6 +55,8 @@ CACHES = {
         'LOCATION': 'redis://scoreboard.redis:6379/1',
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'SOCKET_CONNECT_TIMEOUT': 0.25,
+            'SOCKET_TIMEOUT': 0.25,
         }
     }
 }
@@ -67,6 +70,96 @@ CHANNEL_LAYERS = {
     },
 }
 
+# 'gpio' drives the display from this process, 'daemon' writes to the
+# framebuffer read by `manage.py displayd` (use --mock without a Pi).
+SCORE_DISPLAY = 'gpio'
+SCORE_FRAMEBUFFER = BASE_DIR / 'log' / 'display.fb'
+
+# Number of scoreboards, with ids from 0
+SCORE_BOARD_COUNT = 8
+
+# The scoreboard shown on the LED display
+SCORE_DISPLAY_BOARD = 0
+
+# Per-board options by scoreboard id: players, digits, min_score, max_score
+# (default: what fits in the digits), start_score and overflow, which is
+# 'clamp' (stop at the limits), 'wrap' (roll over to the other end) or
+# 'blank' (keep counting but show blanks outside the range).
+SCORE_BOARDS = {
+    0: {'players': 2, 'digits': 2, 'overflow': 'clamp'},
+}
+
+# Scoreboards are spread over these shards by consistent hashing on their
+# id (see score/sharding.py). Each name must be configured both in CACHES
+# and in CHANNEL_LAYERS, typically one Redis server per shard. Boards that
+# change shard don't take their state along: after editing this list, stop
+# the workers and run `manage.py reshard <the old list>` before restarting.
+SCORE_SHARDS = ['default']
+
+# To try sharding locally, start more redis-servers and list them, e.g.
+# SCORE_REDIS_SHARDS=localhost:6380,localhost:6381 ./manage.py runserver
+for shard, address in enumerate(filter(None, os.environ.get('SCORE_REDIS_SHARDS', '').split(',')), 1):
+    host, port = address.rsplit(':', 1)
+    CACHES['shard%d' % shard] = {
+        **CACHES['default'],
+        'LOCATION': 'redis://%s/1' % address,
+    }
+    CHANNEL_LAYERS['shard%d' % shard] = {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [(host, int(port))],
+        },
+    }
+    SCORE_SHARDS.append('shard%d' % shard)
+
+# Redis outage handling, see score/store.py
+SCORE_BREAKER_THRESHOLD = 1
+SCORE_BREAKER_RESET = 5
+SCORE_CHANNEL_TIMEOUT = 0.25
+
+# Spectators continuously behind for longer than this (seconds) are dropped
+SCORE_SPECTATOR_LAG = 5
+
+# Score changes each client may make per second, with bursts of up to
+# SCORE_TAP_BURST; faster taps are merged and applied as one change
+SCORE_TAP_RATE = 5
+SCORE_TAP_BURST = 10
+
+# Fraction of score changes logged with a timing breakdown, and where
+# POST /profile/<n> writes cProfile dumps of the next n, at most
+# SCORE_PROFILE_MAX_REQUESTS (unset disables it)
+SCORE_TRACE_SAMPLE_RATE = 0
+SCORE_PROFILE_DIR = os.environ.get('SCORE_PROFILE_DIR')
+SCORE_PROFILE_MAX_REQUESTS = 50
+
+# Admin endpoints (/profile, snapshot uploads) only answer requests carrying
+# this token in an X-Score-Token header, and are closed while it is unset
+SCORE_ADMIN_TOKEN = os.environ.get('SCORE_ADMIN_TOKEN')
+
+# Physical buttons wired to the Pi, as (pin, action, sbid[, pid, amount])
+# with action one of 'increase', 'decrease' or 'reset', for example
+# (5, 'increase', 0, 0, 1). Score buttons repeat every SCORE_BUTTON_REPEAT
+# seconds while held.
+SCORE_BUTTONS = []
+SCORE_BUTTON_BOUNCE = 0.02
+SCORE_BUTTON_REPEAT = 0.4
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'score': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
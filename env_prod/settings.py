@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -45,18 +46,108 @@ CACHES = {
         'LOCATION': 'redis://localhost:6379/1',
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'SOCKET_CONNECT_TIMEOUT': 0.25,
+            'SOCKET_TIMEOUT': 0.25,
         }
     }
 }
 
+# 'local' keeps broadcasts inside the process and is only correct while
+# supervisor runs a single worker (numprocs=1); use 'redis' for more.
+CHANNEL_LAYER = os.environ.get('SCORE_CHANNEL_LAYER', 'local')
+
 CHANNEL_LAYERS = {
-    'default': {
+    'local': {
+        'BACKEND': 'score.layers.LocalChannelLayer',
+        'CONFIG': {
+            'capacity': 20,
+            'expiry': 30,
+        },
+    },
+    'redis': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
         'CONFIG': {
             'hosts': [('localhost', 6379)],
         },
     },
 }
+CHANNEL_LAYERS['default'] = CHANNEL_LAYERS[CHANNEL_LAYER]
+
+# 'gpio' drives the display from the web worker itself. 'daemon' leaves the
+# pins (display and buttons) to `manage.py displayd`, with workers writing
+# to the shared framebuffer instead; needed once there is more than one
+# worker, which in turn needs the redis channel layer.
+SCORE_DISPLAY = os.environ.get('SCORE_DISPLAY', 'daemon' if CHANNEL_LAYER == 'redis' else 'gpio')
+SCORE_FRAMEBUFFER = '/dev/shm/scoreboard-display'
+
+# Number of scoreboards, with ids from 0
+SCORE_BOARD_COUNT = 1
+
+# The scoreboard shown on the LED display
+SCORE_DISPLAY_BOARD = 0
+
+# Per-board options by scoreboard id: players, digits, min_score, max_score
+# (default: what fits in the digits), start_score and overflow, which is
+# 'clamp' (stop at the limits), 'wrap' (roll over to the other end) or
+# 'blank' (keep counting but show blanks outside the range).
+SCORE_BOARDS = {
+    0: {'players': 2, 'digits': 2, 'overflow': 'clamp'},
+}
+
+# Scoreboards are spread over these shards by consistent hashing on their
+# id (see score/sharding.py). Each name must be configured both in CACHES
+# and in CHANNEL_LAYERS, typically one Redis server per shard. Boards that
+# change shard don't take their state along: after editing this list, stop
+# the workers and run `manage.py reshard <the old list>` before restarting.
+SCORE_SHARDS = ['default']
+
+# Redis outage handling, see score/store.py
+SCORE_BREAKER_THRESHOLD = 1
+SCORE_BREAKER_RESET = 5
+SCORE_CHANNEL_TIMEOUT = 0.25
+
+# Spectators continuously behind for longer than this (seconds) are dropped
+SCORE_SPECTATOR_LAG = 5
+
+# Score changes each client may make per second, with bursts of up to
+# SCORE_TAP_BURST; faster taps are merged and applied as one change
+SCORE_TAP_RATE = 5
+SCORE_TAP_BURST = 10
+
+# Fraction of score changes logged with a timing breakdown, and where
+# POST /profile/<n> writes cProfile dumps of the next n, at most
+# SCORE_PROFILE_MAX_REQUESTS (unset disables it)
+SCORE_TRACE_SAMPLE_RATE = 0
+SCORE_PROFILE_DIR = os.environ.get('SCORE_PROFILE_DIR')
+SCORE_PROFILE_MAX_REQUESTS = 50
+
+# Admin endpoints (/profile, snapshot uploads) only answer requests carrying
+# this token in an X-Score-Token header, and are closed while it is unset
+SCORE_ADMIN_TOKEN = os.environ.get('SCORE_ADMIN_TOKEN')
+
+# Physical buttons wired to the Pi, as (pin, action, sbid[, pid, amount])
+# with action one of 'increase', 'decrease' or 'reset', for example
+# (5, 'increase', 0, 0, 1). Score buttons repeat every SCORE_BUTTON_REPEAT
+# seconds while held.
+SCORE_BUTTONS = []
+SCORE_BUTTON_BOUNCE = 0.02
+SCORE_BUTTON_REPEAT = 0.4
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'score': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
 
 DATABASES = {
     'default': {
@@ -83,6 +174,7 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'env_prod' / 'static'
 STATIC_URL = '/static/'
+STATICFILES_STORAGE = 'score.storage.CompressedManifestStaticFilesStorage'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import scoring
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now):
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait(self, now):
+        self.refill(now)
+        return max(0, (1 - self.tokens) / self.rate)
+
+
+class Admission:
+    """
+    Per-client token buckets in front of score changes. A tap that finds
+    its client's bucket empty isn't dropped: it is added to a pending delta
+    for that client and board player, and all pending deltas are applied
+    together once the bucket has refilled enough for one more change.
+
+    Flushes are scheduled on one event loop running in a background thread
+    for the life of the process, and apply through the same serialised path
+    as every other score change.
+
+    A reset drops every client's pending taps for the board, including any
+    already being flushed, so none of them land on the fresh board.
+
+    Buckets live in the worker process, so with several workers a client
+    gets up to that many times the rate.
+    """
+    prune_interval = 60
+
+    def __init__(self, apply, reset, rate=None, burst=None):
+        self.apply = apply
+        self.reset_board = reset
+        self.rate = rate or getattr(settings, 'SCORE_TAP_RATE', 5)
+        self.burst = burst or getattr(settings, 'SCORE_TAP_BURST', 10)
+        self.buckets = {}
+        self.pending = {}
+        self.scheduled = set()
+        self.resets = {}
+        self.loop = None
+        self.lock = threading.Lock()
+        self.admitted = 0
+        self.absorbed = 0
+        self.flushes = 0
+        self._next_prune = 0
+
+    def submit(self, client, sbid, pid, delta):
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(client)
+            if bucket is None:
+                bucket = self.buckets[client] = TokenBucket(self.rate, self.burst, now)
+            # Once a client has taps pending, later ones queue behind them so
+            # they are applied in order.
+            admitted = client not in self.pending and bucket.take(now)
+            if admitted:
+                self.admitted += 1
+            else:
+                deltas = self.pending.setdefault(client, {})
+                deltas[sbid, pid] = deltas.get((sbid, pid), 0) + delta
+                self.absorbed += 1
+                if client not in self.scheduled:
+                    self.scheduled.add(client)
+                    asyncio.run_coroutine_threadsafe(
+                        self._flush(client, bucket.wait(now)), self._flusher(),
+                    )
+            if now >= self._next_prune:
+                self._prune(now)
+        if admitted:
+            self.apply(sbid, pid, delta)
+        return admitted
+
+    def reset(self, sbid):
+        with scoring.lock:
+            with self.lock:
+                for deltas in self.pending.values():
+                    for key in [key for key in deltas if key[0] == sbid]:
+                        del deltas[key]
+                self.resets[sbid] = self.resets.get(sbid, 0) + 1
+            self.reset_board(sbid)
+
+    def _flusher(self):
+        # Called with the lock held
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            threading.Thread(target=self.loop.run_forever, name='score-admission', daemon=True).start()
+        return self.loop
+
+    async def _flush(self, client, delay):
+        await asyncio.sleep(delay)
+        with self.lock:
+            self.scheduled.discard(client)
+            deltas = self.pending.pop(client, {})
+            resets = {sbid: self.resets.get(sbid, 0) for sbid, pid in deltas}
+            bucket = self.buckets[client]
+            bucket.refill(time.monotonic())
+            bucket.tokens -= 1
+            self.flushes += 1
+        for (sbid, pid), delta in deltas.items():
+            if not delta:
+                continue
+            try:
+                # In a worker thread, whose broadcasts come back to this loop
+                await sync_to_async(self._apply_merged, thread_sensitive=False)(sbid, pid, delta, resets[sbid])
+            except Exception:
+                logger.exception('Applying merged taps for board %d player %d failed', sbid, pid)
+
+    def _apply_merged(self, sbid, pid, delta, generation):
+        with scoring.lock:
+            # Dropped if the board was reset since these taps were taken
+            if self.resets.get(sbid, 0) == generation:
+                self.apply(sbid, pid, delta)
+
+    def _prune(self, now):
+        self._next_prune = now + self.prune_interval
+        for client, bucket in list(self.buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.burst and client not in self.pending:
+                del self.buckets[client]
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'admitted': self.admitted,
+                'absorbed': self.absorbed,
+                'merged_flushes': self.flushes,
+                'pending_clients': len(self.pending),
+                'tracked_clients': len(self.buckets),
+            }
+
+
+admission = Admission(scoring.change_score, scoring.reset_scores)
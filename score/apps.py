@@ -6,4 +6,4 @@ class AppConfig(BaseAppConfig):
     verbose_name = 'score'
 
     def ready(self):
-        from . import hardware  # noqa
+        from . import buttons, hardware  # noqa
@@ -0,0 +1,128 @@
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.checks import Warning, register
+from gpiozero import Button, GPIOZeroError
+
+from .admission import admission
+from .scoring import change_score
+from .tracing import traced
+
+logger = logging.getLogger(__name__)
+
+
+class ButtonWorker:
+    """
+    Applies button presses to the scoreboard on a background thread, so the
+    GPIO event thread only ever enqueues and goes straight back to watching
+    the pins.
+    """
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='score-buttons', daemon=True)
+            self.thread.start()
+
+    def submit(self, action, *args):
+        self.queue.put((time.perf_counter(), action, args))
+
+    def run(self):
+        while True:
+            pressed, action, args = self.queue.get()
+            if action is None:
+                return
+            try:
+                self.apply(action, *args)
+            except Exception:
+                logger.exception('Button %s%r failed', action, args)
+            else:
+                logger.debug(
+                    'Button %s%r applied %.2fms after press',
+                    action, args, (time.perf_counter() - pressed) * 1000,
+                )
+
+    def stop(self):
+        if self.thread is not None:
+            self.queue.put((None, None, None))
+            self.thread.join()
+            self.thread = None
+
+    @traced('Button', root=True)
+    def apply(self, action, sbid, pid=None, amount=1):
+        if action == 'increase':
+            change_score(sbid, pid, amount)
+        elif action == 'decrease':
+            change_score(sbid, pid, -amount)
+        elif action == 'reset':
+            admission.reset(sbid)
+        else:
+            raise ValueError('unknown button action %r' % action)
+
+
+def setup_buttons(config, worker, pin_factory=None):
+    """
+    Creates a gpiozero Button per (pin, action, sbid[, pid, amount]) entry
+    of config, pressing into worker. Score buttons repeat while held;
+    reset doesn't.
+    """
+    bounce = getattr(settings, 'SCORE_BUTTON_BOUNCE', 0.02)
+    repeat = getattr(settings, 'SCORE_BUTTON_REPEAT', 0.4)
+    created = []
+    try:
+        for pin, action, *args in config:
+            button = Button(pin, bounce_time=bounce, hold_time=repeat, hold_repeat=True, pin_factory=pin_factory)
+            button.when_pressed = _press(worker, action, args)
+            if action != 'reset':
+                button.when_held = button.when_pressed
+            created.append(button)
+    except GPIOZeroError:
+        for button in created:
+            button.close()
+        raise
+    return created
+
+
+def _press(worker, action, args):
+    def pressed():
+        worker.submit(action, *args)
+    return pressed
+
+
+def start(pin_factory=None):
+    """
+    Sets up SCORE_BUTTONS. Only the process owning the pins may call this:
+    the ASGI server, or displayd in daemon mode.
+    """
+    global buttons, button_error
+    if not getattr(settings, 'SCORE_BUTTONS', None) or buttons:
+        return
+    try:
+        buttons = setup_buttons(settings.SCORE_BUTTONS, worker, pin_factory)
+    except GPIOZeroError as exc:
+        button_error = exc
+    else:
+        worker.start()
+
+
+worker = ButtonWorker()
+buttons = []
+button_error = None
+
+
+@register()
+def check_buttons(app_configs, **kwargs):
+    errors = []
+    if button_error is not None:
+        errors.append(
+            Warning(
+                'Physical buttons could not be set up: %s' % button_error,
+                id='score.E002',
+            )
+        )
+    return errors
@@ -1,9 +1,11 @@
 import json
 
 from asgiref.sync import async_to_sync
-from channels.generic.websocket import WebsocketConsumer
+from channels.generic.websocket import AsyncWebsocketConsumer, WebsocketConsumer
 
 from .scoring import Scoreboard
+from .spectators import get_board
+from .store import get_groups, ring
 
 
 class Consumer(WebsocketConsumer):
@@ -11,22 +13,55 @@ class Consumer(WebsocketConsumer):
         super().__init__(*args, **kwargs)
         self.state = {}
 
+    async def __call__(self, scope, receive, send):
+        # Talk to the channel layer of the shard that owns this board, which
+        # is where its broadcasts are sent.
+        self.channel_layer_alias = ring.node(scope['url_route']['kwargs']['sbid'])
+        await super().__call__(scope, receive, send)
+
     def get_scoreboard(self):
         return Scoreboard(self.sbid)
 
     def connect(self):
         self.sbid = self.scope['url_route']['kwargs']['sbid']
         self.group = 'sb%d' % self.sbid
-        async_to_sync(self.channel_layer.group_add)(self.group, self.channel_name)
+        joined = async_to_sync(get_groups(self.sbid).add)(self.group, self.channel_name)
         self.accept()
 
         scoreboard = self.get_scoreboard()
         self.update({
             'data': scoreboard.as_dict()
         })
+        if not joined:
+            # Without group membership this socket would never see updates;
+            # closing makes the client reconnect and retry until the channel
+            # layer is back.
+            self.close()
 
     def disconnect(self, close_code):
-        async_to_sync(self.channel_layer.group_discard)(self.group, self.channel_name)
+        async_to_sync(get_groups(self.sbid).discard)(self.group, self.channel_name)
 
     def update(self, event):
         self.send(text_data=json.dumps(event['data']))
+
+
+class SpectatorConsumer(AsyncWebsocketConsumer):
+    # Updates reach spectators through their board's broadcaster rather than
+    # a channel of their own, so don't allocate one per socket.
+    channel_layer_alias = None
+
+    async def connect(self):
+        sbid = self.scope['url_route']['kwargs']['sbid']
+        if sbid >= Scoreboard.max_scoreboards:
+            await self.close()
+            return
+        await self.accept()
+        self.client = get_board(sbid).join(self)
+
+    async def disconnect(self, close_code):
+        client = getattr(self, 'client', None)
+        if client is not None:
+            client.board.leave(client)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        pass
@@ -0,0 +1,89 @@
+import fcntl
+import mmap
+import os
+import socket
+import struct
+import time
+
+
+class FrameBuffer:
+    """
+    A small memory-mapped file holding the text for the LED display, shared
+    between the web workers that write it and the display daemon that owns
+    the GPIO pins.
+
+    The header is a sequence counter and the text length. Writers hold an
+    flock while writing and bump the counter to an odd value before and an
+    even one after, so a reader that sees an odd or changed counter knows to
+    retry, falling back to the lock after a few tries. After each write a datagram is sent to the daemon's socket to
+    wake it up; writers never block on it.
+    """
+    size = 64
+    header = struct.Struct('=QB')
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.socket_path = self.path + '.sock'
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o660)
+        if os.fstat(self.fd).st_size < self.size:
+            os.ftruncate(self.fd, self.size)
+        self.map = mmap.mmap(self.fd, self.size)
+        self.notifier = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.notifier.setblocking(False)
+
+    def close(self):
+        self.map.close()
+        os.close(self.fd)
+        self.notifier.close()
+
+    @property
+    def sequence(self):
+        return self.header.unpack_from(self.map)[0]
+
+    def write(self, value):
+        data = value.encode()[:self.size - self.header.size]
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            # Odd already if a writer died halfway, which this write repairs
+            sequence = self.sequence | 1
+            self.header.pack_into(self.map, 0, sequence, 0)
+            self.map[self.header.size:self.header.size + len(data)] = data
+            self.header.pack_into(self.map, 0, sequence + 1, len(data))
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        try:
+            self.notifier.sendto(b'\0', self.socket_path)
+        except OSError:
+            # No daemon listening, or it already has wake-ups queued
+            pass
+
+    def read(self, retries=100):
+        for attempt in range(retries):
+            sequence, length = self.header.unpack_from(self.map)
+            data = self.map[self.header.size:self.header.size + length]
+            if sequence % 2 == 0 and self.sequence == sequence:
+                return sequence, data.decode()
+            time.sleep(0)
+        # Still odd: either a writer is slow or one died mid-write. Under the
+        # lock nobody is writing, so whatever is there is all there will be
+        # until the next write.
+        fcntl.flock(self.fd, fcntl.LOCK_SH)
+        try:
+            sequence, length = self.header.unpack_from(self.map)
+            data = self.map[self.header.size:self.header.size + length]
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        return sequence, data.decode(errors='replace')
+
+    def listen(self):
+        """
+        Returns a socket that becomes readable whenever the buffer changes.
+        Only the daemon should call this.
+        """
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        listener.bind(self.socket_path)
+        return listener
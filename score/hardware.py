@@ -1,6 +1,12 @@
+import threading
+
+from django.conf import settings
 from django.core.checks import Warning, register
 from gpiozero import DigitalOutputDevice, GPIOZeroError
 
+from .framebuffer import FrameBuffer
+from .tracing import traced
+
 
 class DigitDisplay:
     """
@@ -34,25 +40,31 @@ class DigitDisplay:
         '-': g,
     }
 
-    def __init__(self, clock_pin=25, latch_pin=23, data_pin=24):
-        self.clock = DigitalOutputDevice(clock_pin)
-        self.latch = DigitalOutputDevice(latch_pin)
-        self.data = DigitalOutputDevice(data_pin)
+    def __init__(self, clock_pin=25, latch_pin=23, data_pin=24, pin_factory=None):
+        self.clock = DigitalOutputDevice(clock_pin, pin_factory=pin_factory)
+        self.latch = DigitalOutputDevice(latch_pin, pin_factory=pin_factory)
+        self.data = DigitalOutputDevice(data_pin, pin_factory=pin_factory)
         self.value = '0000'
 
+    @classmethod
+    def encode(cls, value):
+        return bytes(cls.digits.get(digit, 0) for digit in value)
+
     @property
     def value(self):
         return self._value
 
     @value.setter
     def value(self, value):
+        self.show(value)
+
+    def show(self, value, segments=None):
         self._value = value
+        self._segments = self.encode(value) if segments is None else segments
         self._display_value()
 
     def _display_value(self):
-        for digit in reversed(self.value):
-            segs = self.digits.get(digit, 0)
-
+        for segs in reversed(self._segments):
             for bit in range(8):
                 self.clock.off()
                 self.data.value = segs & 1 << (7 - bit)
@@ -62,16 +74,33 @@ class DigitDisplay:
         self.latch.on()
 
 
-try:
-    display = DigitDisplay()
-except GPIOZeroError:
-    display = None
+# With SCORE_DISPLAY = 'daemon' the pins belong to the displayd management
+# command, and this process only writes to the shared framebuffer.
+daemon_mode = getattr(settings, 'SCORE_DISPLAY', 'gpio') == 'daemon'
+display = None
+display_error = None
+framebuffer = None
+display_lock = threading.Lock()
+
+
+def start(pin_factory=None):
+    """
+    Claims the display pins. Only the process owning them may call this:
+    the ASGI server, unless displayd does in daemon mode.
+    """
+    global display, display_error
+    if display is not None:
+        return
+    try:
+        display = DigitDisplay(pin_factory=pin_factory)
+    except GPIOZeroError as exc:
+        display_error = exc
 
 
 @register()
 def check_display(app_configs, **kwargs):
     errors = []
-    if display is None:
+    if display_error is not None:
         errors.append(
             Warning(
                 'No LED display board connected. Check the pins!',
@@ -81,10 +110,20 @@ def check_display(app_configs, **kwargs):
     return errors
 
 
-def set_display(value):
-    if display is None:
-        return
-    try:
-        display.value = value
-    except GPIOZeroError:
-        pass
+@traced('set_display')
+def set_display(value, segments=None):
+    global framebuffer
+    # Request threads and the button worker can update the display at the
+    # same time; interleaved shift-outs would garble the digits.
+    with display_lock:
+        if daemon_mode:
+            if framebuffer is None:
+                framebuffer = FrameBuffer(settings.SCORE_FRAMEBUFFER)
+            framebuffer.write(value)
+            return
+        if display is None:
+            return
+        try:
+            display.show(value, segments)
+        except GPIOZeroError:
+            pass
@@ -0,0 +1,167 @@
+import asyncio
+import random
+import string
+import threading
+import time
+from collections import deque
+from copy import deepcopy
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+
+class _Channel:
+    __slots__ = ('messages', 'waiters', 'stalled_since')
+
+    def __init__(self, capacity):
+        self.messages = deque(maxlen=capacity)
+        self.waiters = deque()
+        self.stalled_since = None
+
+
+class LocalChannelLayer(BaseChannelLayer):
+    """
+    Channel layer for a single-process deployment, where every consumer
+    lives in the same process as the code broadcasting to it.
+
+    Unlike channels' own InMemoryChannelLayer, a group send copies the
+    message once rather than once per member, queues are bounded deques
+    that drop the oldest message when a member falls behind (every update
+    carries the full scoreboard state, so only the newest one matters), and
+    the scan for dead channels runs at most every few seconds instead of on
+    every send and receive.
+    """
+    extensions = ['groups', 'flush']
+
+    def __init__(self, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity, **kwargs)
+        self.group_expiry = group_expiry
+        self.channels = {}
+        self.groups = {}
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self._next_clean = 0
+
+    async def new_channel(self, prefix='specific.'):
+        return '%s.local!%s' % (
+            prefix,
+            ''.join(random.choice(string.ascii_letters) for i in range(12)),
+        )
+
+    def _channel(self, name):
+        channel = self.channels.get(name)
+        if channel is None:
+            channel = self.channels[name] = _Channel(self.get_capacity(name))
+        return channel
+
+    def _put(self, name, message, drop_oldest):
+        channel = self._channel(name)
+        if len(channel.messages) == channel.messages.maxlen:
+            if not drop_oldest:
+                raise ChannelFull(name)
+            self.dropped += 1
+        elif not channel.messages and channel.stalled_since is None:
+            channel.stalled_since = time.monotonic()
+        channel.messages.append(message)
+        while channel.waiters:
+            waiter = channel.waiters.popleft()
+            if not waiter.done():
+                # Senders may be running in another thread's event loop,
+                # e.g. async_to_sync from a background worker.
+                waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+                break
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        assert self.valid_channel_name(channel), 'Channel name not valid'
+        assert '__asgi_channel__' not in message
+        with self.lock:
+            self._put(channel, deepcopy(message), drop_oldest=False)
+
+    async def receive(self, channel):
+        assert self.valid_channel_name(channel)
+        self._clean_expired()
+        while True:
+            with self.lock:
+                queue = self._channel(channel)
+                if queue.messages:
+                    message = queue.messages.popleft()
+                    queue.stalled_since = time.monotonic() if queue.messages else None
+                    return message
+                waiter = asyncio.get_running_loop().create_future()
+                queue.waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                with self.lock:
+                    if waiter in queue.waiters:
+                        queue.waiters.remove(waiter)
+
+    def _clean_expired(self):
+        now = time.monotonic()
+        if now < self._next_clean:
+            return
+        self._next_clean = now + min(self.expiry, 5)
+        with self.lock:
+            # A channel whose oldest message has sat unread for longer than
+            # the expiry belongs to a consumer that has gone away.
+            dead = [
+                name for name, channel in self.channels.items()
+                if channel.stalled_since is not None
+                and now - channel.stalled_since > self.expiry
+            ]
+            idle = [
+                name for name, channel in self.channels.items()
+                if not channel.messages and not channel.waiters
+            ]
+            for name in dead + idle:
+                del self.channels[name]
+            timeout = time.time() - self.group_expiry
+            for group, members in list(self.groups.items()):
+                for name, joined in list(members.items()):
+                    if name in dead or joined < timeout:
+                        del members[name]
+                if not members:
+                    del self.groups[group]
+
+    async def flush(self):
+        with self.lock:
+            self.channels = {}
+            self.groups = {}
+
+    async def close(self):
+        pass
+
+    async def group_add(self, group, channel):
+        assert self.valid_group_name(group), 'Group name not valid'
+        assert self.valid_channel_name(channel), 'Channel name not valid'
+        with self.lock:
+            self.groups.setdefault(group, {})[channel] = time.time()
+
+    async def group_discard(self, group, channel):
+        assert self.valid_channel_name(channel), 'Invalid channel name'
+        assert self.valid_group_name(group), 'Invalid group name'
+        with self.lock:
+            members = self.groups.get(group)
+            if members is not None:
+                members.pop(channel, None)
+                if not members:
+                    del self.groups[group]
+            if channel in self.channels and not self.channels[channel].waiters:
+                del self.channels[channel]
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'Message is not a dict'
+        assert self.valid_group_name(group), 'Invalid group name'
+        self._clean_expired()
+        # Consumers only read the events they receive, so every member can
+        # share a single copy.
+        message = deepcopy(message)
+        with self.lock:
+            for channel in self.groups.get(group, ()):
+                self._put(channel, message, drop_oldest=True)
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
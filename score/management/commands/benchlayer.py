@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+from channels.layers import channel_layers
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Measure group_send fan-out latency and CPU cost of channel layers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', default=['default'])
+        parser.add_argument('--clients', type=int, default=20)
+        parser.add_argument('--messages', type=int, default=500)
+
+    def handle(self, aliases, clients, messages, **options):
+        for alias in aliases:
+            latencies, cpu = asyncio.run(self.bench(channel_layers[alias], clients, messages))
+            latencies.sort()
+            self.stdout.write(
+                '%s (%s): mean %.3fms, p99 %.3fms, cpu %.1fus/message' % (
+                    alias,
+                    type(channel_layers[alias]).__name__,
+                    sum(latencies) / len(latencies) * 1000,
+                    latencies[int(len(latencies) * 0.99)] * 1000,
+                    cpu / messages * 1e6,
+                )
+            )
+
+    async def bench(self, layer, clients, messages):
+        group = 'bench'
+        channels = [await layer.new_channel() for i in range(clients)]
+        for channel in channels:
+            await layer.group_add(group, channel)
+
+        latencies = []
+        cpu = time.process_time()
+        try:
+            for i in range(messages):
+                receivers = [asyncio.ensure_future(receive_one(layer, channel)) for channel in channels]
+                start = time.perf_counter()
+                await layer.group_send(group, {'type': 'update', 'data': {'sbid': 0, 'players': []}})
+                await asyncio.gather(*receivers)
+                latencies.append(time.perf_counter() - start)
+        finally:
+            cpu = time.process_time() - cpu
+            for channel in channels:
+                await layer.group_discard(group, channel)
+            await layer.close()
+        return latencies, cpu
+
+
+async def receive_one(layer, channel):
+    return await layer.receive(channel)
@@ -0,0 +1,62 @@
+import logging
+import select
+import socket
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from gpiozero.pins.mock import MockFactory
+
+from score import buttons
+from score.framebuffer import FrameBuffer
+from score.hardware import DigitDisplay
+
+logger = logging.getLogger(__name__)
+
+
+class DisplayDaemon:
+    def __init__(self, display, framebuffer):
+        self.display = display
+        self.framebuffer = framebuffer
+        self.listener = framebuffer.listen()
+        self.shown = None
+
+    def refresh(self):
+        sequence, value = self.framebuffer.read()
+        if sequence != self.shown:
+            self.shown = sequence
+            if sequence:
+                self.display.value = value
+            logger.debug('Display shows %r (frame %d)', value, sequence)
+
+    def run_once(self, timeout=None):
+        readable, _, _ = select.select([self.listener], [], [], timeout)
+        if readable:
+            # Several writes may have queued wake-ups; showing the latest
+            # frame once covers all of them.
+            while True:
+                try:
+                    self.listener.recv(16, socket.MSG_DONTWAIT)
+                except BlockingIOError:
+                    break
+        self.refresh()
+
+    def run(self):
+        self.refresh()
+        while True:
+            # The timeout catches any wake-up lost while the daemon was busy
+            self.run_once(timeout=1)
+
+
+class Command(BaseCommand):
+    help = 'Own the display GPIO pins and show whatever the web workers write to the framebuffer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mock', action='store_true', help='Use mock pins instead of real GPIO.')
+
+    def handle(self, mock, **options):
+        pin_factory = MockFactory() if mock else None
+        display = DigitDisplay(pin_factory=pin_factory)
+        buttons.start(pin_factory)
+        framebuffer = FrameBuffer(settings.SCORE_FRAMEBUFFER)
+        self.stdout.write('Display daemon reading %s' % framebuffer.path)
+        DisplayDaemon(display, framebuffer).run()
@@ -0,0 +1,23 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from score.snapshot import export_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Write a gzipped snapshot of every scoreboard (scores, versions, config).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Snapshot file to write, or '-' for stdout.")
+
+    def handle(self, output, **options):
+        if output == '-':
+            self._write(sys.stdout.buffer)
+        else:
+            with open(output, 'wb') as fileobj:
+                self._write(fileobj)
+
+    def _write(self, fileobj):
+        for chunk in export_snapshot():
+            fileobj.write(chunk)
@@ -0,0 +1,67 @@
+import json
+import sys
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Load a scoreboard snapshot from a file, or keep following a primary '
+        "Pi's /snapshot endpoint so this one can take over at any moment. "
+        "The snapshot is posted to this Pi's running server, which owns the "
+        'display and the connected clients.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Snapshot file, '-' for stdin, or the primary's snapshot URL with --follow.")
+        parser.add_argument('--follow', action='store_true', help='Poll the source URL and apply changes until stopped.')
+        parser.add_argument('--interval', type=float, default=0.5, help='Seconds between polls when following.')
+        parser.add_argument(
+            '--target', default='http://127.0.0.1:8000/snapshot',
+            help="This Pi's snapshot URL to load into.",
+        )
+        parser.add_argument(
+            '--token', default=getattr(settings, 'SCORE_ADMIN_TOKEN', None),
+            help="The target's admin token (default: SCORE_ADMIN_TOKEN).",
+        )
+
+    def handle(self, source, follow, interval, target, token, **options):
+        if not follow:
+            try:
+                changed = self._load(self._read(source), target, token)
+            except OSError as exc:
+                raise CommandError('Loading into %s failed: %s' % (target, exc))
+            self.stdout.write('Loaded %d scoreboards' % len(changed))
+            return
+
+        while True:
+            try:
+                changed = self._load(self._read(source), target, token)
+            except OSError as exc:
+                self.stderr.write('Following %s into %s failed: %s' % (source, target, exc))
+            else:
+                if changed:
+                    self.stdout.write('Updated scoreboards %s' % ', '.join(map(str, changed)))
+            time.sleep(interval)
+
+    def _read(self, source):
+        if source.startswith(('http://', 'https://')):
+            with urllib.request.urlopen(source, timeout=5) as response:
+                return response.read()
+        if source == '-':
+            return sys.stdin.buffer.read()
+        try:
+            with open(source, 'rb') as fileobj:
+                return fileobj.read()
+        except OSError as exc:
+            raise CommandError(exc)
+
+    def _load(self, data, target, token):
+        request = urllib.request.Request(target, data=data, headers={'Content-Type': 'application/gzip'})
+        if token:
+            request.add_header('X-Score-Token', token)
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return json.load(response)['changed']
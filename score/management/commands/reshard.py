@@ -0,0 +1,46 @@
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.core.management.base import BaseCommand, CommandError
+
+from score.scoring import Scoreboard
+from score.sharding import HashRing
+from score.store import StateStore, ring, stores
+
+
+class Command(BaseCommand):
+    help = (
+        'Move scoreboard state onto the shards SCORE_SHARDS now assigns it to, '
+        'after shards were added or removed. Stop the web workers and displayd '
+        'first; every old shard must still be configured in CACHES.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('old_shards', nargs='+', help='SCORE_SHARDS as it was before the change.')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the boards that would move.')
+
+    def handle(self, old_shards, dry_run, **options):
+        old_ring = HashRing(old_shards)
+        try:
+            old_stores = {alias: stores.get(alias) or StateStore(alias) for alias in old_ring.nodes}
+        except InvalidCacheBackendError as exc:
+            raise CommandError(exc)
+
+        moved = 0
+        for sbid in range(Scoreboard.max_scoreboards):
+            source, target = old_ring.node(sbid), ring.node(sbid)
+            if source == target:
+                continue
+            keys = Scoreboard.state_keys(sbid)
+            # A board already written on its new shard keeps what is newer
+            existing = stores[target].dump(keys)
+            items = {
+                key: item
+                for key, item in old_stores[source].dump(keys).items()
+                if item[1] > existing.get(key, (None, 0))[1]
+            }
+            if not items:
+                continue
+            self.stdout.write('Board %d: %s -> %s' % (sbid, source, target))
+            if not dry_run:
+                stores[target].load(items)
+            moved += 1
+        self.stdout.write('%s %d scoreboards' % ('Would move' if dry_run else 'Moved', moved))
@@ -5,4 +5,5 @@ from . import consumers
 
 urlpatterns = [
     path('ws/sb<int:sbid>', consumers.Consumer.as_asgi(), name='websocket'),
+    path('ws/spectate/sb<int:sbid>', consumers.SpectatorConsumer.as_asgi(), name='spectate'),
 ]
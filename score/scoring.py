@@ -1,34 +1,63 @@
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-from django.core.cache import cache
+import functools
+import threading
 
-from .hardware import set_display
+from django.conf import settings
+
+from .hardware import DigitDisplay, set_display
+from .stats import MatchStats
+from .store import get_groups, get_store
+from .tracing import traced
+
+
+# Score changes read a board's state, modify it and write it back, and come
+# from request threads as well as background workers; holding this around
+# each change keeps them from overwriting one another within a process.
+lock = threading.RLock()
+
+
+def change_score(sbid, pid, delta):
+    with lock:
+        sb = Scoreboard(sbid)
+        sb[pid] + delta
+
+
+def reset_scores(sbid):
+    with lock:
+        Scoreboard(sbid).reset()
+
+
+@functools.lru_cache(maxsize=4096)
+def render(score, digits, min_score, max_score):
+    # Boards are built on every request and socket connect, but a board only
+    # ever shows a few distinct values; each is formatted and encoded once.
+    if min_score <= score <= max_score:
+        text = '%0*d' % (digits, score)
+    else:
+        text = ' ' * digits
+    return text, DigitDisplay.encode(text)
 
 
 class Player:
-    min_score = 0
-    max_score = 100
-    start_score = 0
+    cache_key_format = 'sb%d_p%d'
 
-    def __init__(self, scoreboard, pid):
+    def __init__(self, scoreboard, pid, cache_score=None):
+        # The stored score is read by the scoreboard, along with the rest of
+        # its state
         self.scoreboard = scoreboard
         self.pid = pid
+        self.cache_key = self.cache_key_format % (scoreboard.sbid, pid)
 
-        self.score = self.start_score
-        self.cache_key = 'sb%d_p%d' % (scoreboard.sbid, pid)
-
-        cache_score = cache.get(self.cache_key, self.start_score)
-        self._set_score(cache_score, initial=True)
+        if cache_score is None:
+            cache_score = scoreboard.start_score
+        self.score = self._bound(cache_score)
+        self._render()
 
     def as_dict(self):
-        return {
-            'pid': self.pid,
-            'score': self.score,
-            'str': str(self),
-        }
+        return self._dict
 
     def reset(self):
-        self._set_score(self.start_score)
+        # Stats and clients are brought up to date once by Scoreboard.reset
+        self._set_score(self.scoreboard.start_score, quiet=True)
 
     def __add__(self, other):
         self._set_score(self.score + int(other))
@@ -47,39 +76,97 @@ class Player:
             return False
 
     def __str__(self):
-        max_score = 10 ** self.scoreboard.digits - 1
-        score = min(self.score, max_score)
-        return "%02d" % score
+        return self.text
+
+    def _bound(self, score):
+        sb = self.scoreboard
+        if sb.overflow == 'clamp':
+            return max(min(score, sb.max_score), sb.min_score)
+        if sb.overflow == 'wrap':
+            return sb.min_score + (score - sb.min_score) % (sb.max_score - sb.min_score + 1)
+        return score
+
+    def _render(self):
+        sb = self.scoreboard
+        self.text, self.segments = render(self.score, sb.digits, sb.min_score, sb.max_score)
+        self._dict = {
+            'pid': self.pid,
+            'score': self.score,
+            'str': self.text,
+        }
 
-    def _set_score(self, score, initial=False):
-        new_score = max(min(score, self.max_score), self.min_score)
+    def _set_score(self, score, quiet=False):
+        new_score = self._bound(score)
         if new_score == self.score:
             return
+        # A wrap-around is recorded as the change that was asked for, not
+        # as a correction by the size of the range.
+        if self.scoreboard.overflow == 'wrap':
+            delta = score - self.score
+        else:
+            delta = new_score - self.score
         self.score = new_score
-        if not initial:
-            cache.set(self.cache_key, self.score, timeout=None)
-            self.scoreboard.broadcast()
+        self._render()
+        self.scoreboard.store.set(self.cache_key, self.score)
+        if quiet:
+            return
+        self.scoreboard.record(self.pid, delta)
+        self.scoreboard.broadcast()
 
 
 class Scoreboard:
-    max_scoreboards = 1
+    max_scoreboards = getattr(settings, 'SCORE_BOARD_COUNT', 1)
+    display_board = getattr(settings, 'SCORE_DISPLAY_BOARD', 0)
     max_players = 2
-    max_digits = 2
+    max_digits = 8
+    overflow_modes = ('clamp', 'wrap', 'blank')
     player_class = Player
-
-    def __init__(self, sbid=0, players=2, digits=2):
+    stats_class = MatchStats
+    stats_key_format = 'sb%d_stats'
+
+    @classmethod
+    def config(cls, sbid):
+        return getattr(settings, 'SCORE_BOARDS', {}).get(sbid, {})
+
+    @classmethod
+    def state_keys(cls, sbid):
+        return [
+            cls.player_class.cache_key_format % (sbid, pid)
+            for pid in range(cls.config(sbid).get('players', 2))
+        ] + [cls.stats_key_format % sbid]
+
+    @traced('Scoreboard.__init__')
+    def __init__(self, sbid=0, **config):
+        # Per-board options come from SCORE_BOARDS, overridden by arguments
+        config = {**self.config(sbid), **config}
+        players = config.get('players', 2)
+        digits = config.get('digits', 2)
+        self.min_score = config.get('min_score', 0)
+        self.max_score = config.get('max_score', 10 ** digits - 1)
+        self.start_score = config.get('start_score', max(self.min_score, 0))
+        self.overflow = config.get('overflow', 'clamp')
         if (
             sbid + 1 > self.max_scoreboards
             or players > self.max_players
             or digits > self.max_digits
+            or self.overflow not in self.overflow_modes
+            or not self.min_score <= self.start_score <= self.max_score
+            or len('%0*d' % (digits, self.min_score)) > digits
+            or len('%0*d' % (digits, self.max_score)) > digits
         ):
             raise ValueError
         self.sbid = sbid
         self.digits = digits
+        self.store = get_store(sbid)
+        self.stats_key = self.stats_key_format % sbid
+        # One round trip for every player's score and the stats
+        keys = [self.player_class.cache_key_format % (sbid, pid) for pid in range(players)]
+        state = self.store.get_many(keys + [self.stats_key])
         self.players = tuple(
-            self.player_class(self, pid)
-            for pid in range(players)
+            self.player_class(self, pid, state[key])
+            for pid, key in enumerate(keys)
         )
+        self.stats = self.stats_class(players, state[self.stats_key])
 
     def as_dict(self):
         return {
@@ -88,22 +175,31 @@ class Scoreboard:
                 player.as_dict()
                 for player in self.players
             ],
+            'stats': self.stats.as_dict(),
         }
 
+    def record(self, pid, delta):
+        self.stats.record(pid, delta, [player.score for player in self.players])
+        self.store.set(self.stats_key, self.stats.state())
+
+    @traced('broadcast')
     def broadcast(self):
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(f'sb{self.sbid}', {
+        if self.sbid == self.display_board:
+            set_display(
+                ''.join(player.text for player in self.players),
+                b''.join(player.segments for player in self.players),
+            )
+        get_groups(self.sbid).send_sync(f'sb{self.sbid}', {
             'type': 'update',
             'data': self.as_dict(),
         })
-        set_display(''.join(
-            str(player)
-            for player in self.players
-        ))
 
     def reset(self):
         for player in self.players:
             player.reset()
+        self.stats = self.stats_class(len(self.players))
+        self.store.set(self.stats_key, self.stats.state())
+        self.broadcast()
 
     def __getitem__(self, item):
         return self.players[item]
@@ -0,0 +1,38 @@
+import bisect
+import hashlib
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping scoreboard ids to shard names. Each shard
+    gets many points on the ring, so adding one moves only about 1/n of
+    the boards, all of them onto the new shard.
+    """
+    def __init__(self, nodes, replicas=160):
+        if not nodes:
+            raise ValueError('a hash ring needs at least one node')
+        self.nodes = list(nodes)
+        self.ring = sorted(
+            (self._hash('%s#%d' % (node, i)), node)
+            for node in self.nodes
+            for i in range(replicas)
+        )
+        self.points = [point for point, node in self.ring]
+        self._lookups = {}
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.md5(str(value).encode()).digest()[:8], 'big')
+
+    def node(self, key):
+        try:
+            return self._lookups[key]
+        except KeyError:
+            pass
+        if len(self.nodes) == 1:
+            node = self.nodes[0]
+        else:
+            index = bisect.bisect(self.points, self._hash(key)) % len(self.points)
+            node = self.ring[index][1]
+        self._lookups[key] = node
+        return node
@@ -0,0 +1,127 @@
+import gzip
+import json
+import logging
+import time
+import zlib
+from itertools import islice
+
+from .scoring import Scoreboard, lock
+from .store import get_store
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 1
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_records(chunk_size=100):
+    """
+    Yields a header record, then one record per scoreboard holding its
+    config and every state key with its value and version. Boards are read
+    a chunk at a time with one multi-key cache read per shard.
+    """
+    yield {'format': FORMAT, 'created': time.time()}
+    for sbids in _chunks(range(Scoreboard.max_scoreboards), chunk_size):
+        by_store = {}
+        for sbid in sbids:
+            by_store.setdefault(get_store(sbid), []).append(sbid)
+        for store, store_sbids in by_store.items():
+            state = store.dump([
+                key for sbid in store_sbids for key in Scoreboard.state_keys(sbid)
+            ])
+            for sbid in store_sbids:
+                yield {
+                    'sbid': sbid,
+                    'config': Scoreboard.config(sbid),
+                    'state': {
+                        key: state[key]
+                        for key in Scoreboard.state_keys(sbid)
+                        if key in state
+                    },
+                }
+
+
+def export_snapshot():
+    """
+    The snapshot as a stream of gzip-compressed chunks of JSON lines.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for record in export_records():
+        chunk = compressor.compress(json.dumps(record, separators=(',', ':')).encode() + b'\n')
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def read_snapshot(fileobj):
+    with gzip.open(fileobj, 'rt') as lines:
+        header = next(lines, None)
+        if header is None:
+            raise ValueError('empty snapshot')
+        header = json.loads(header)
+        if header.get('format') != FORMAT:
+            raise ValueError('unsupported snapshot format %r' % header.get('format'))
+        for line in lines:
+            yield json.loads(line)
+
+
+def import_snapshot(records, chunk_size=500):
+    """
+    Loads board records into the stores, keeping their versions, with one
+    pipelined write per shard and chunk. Keys already at the snapshot's
+    version are skipped, so a standby following its primary only writes
+    what changed. Returns the ids of the boards changed.
+    """
+    changed = []
+    for chunk in _chunks(records, chunk_size):
+        by_store = {}
+        for record in chunk:
+            sbid = record['sbid']
+            if not 0 <= sbid < Scoreboard.max_scoreboards:
+                raise ValueError('board %r is not configured here' % sbid)
+        for record in chunk:
+            sbid = record['sbid']
+            if record['config'] != Scoreboard.config(sbid):
+                logger.warning('Board %d is configured differently from the snapshot', sbid)
+            store = get_store(sbid)
+            items = {
+                key: tuple(item)
+                for key, item in record['state'].items()
+                if store.version(key) != item[1]
+            }
+            if items:
+                by_store.setdefault(store, {}).update(items)
+                changed.append(sbid)
+        for store, items in by_store.items():
+            store.load(items)
+    return changed
+
+
+def show(sbids):
+    """
+    Puts imported boards on the display and out to any connected clients.
+    """
+    for sbid in sbids:
+        Scoreboard(sbid).broadcast()
+
+
+def load_snapshot(fileobj):
+    """
+    Imports a snapshot and shows the boards it changed. This has to run in
+    the serving process, which owns the display and the clients, and holds
+    the score lock so no tap lands halfway through.
+    """
+    # Parsed in full first, so a damaged snapshot changes nothing
+    records = list(read_snapshot(fileobj))
+    with lock:
+        changed = import_snapshot(records, chunk_size=len(records) or 1)
+        show(changed)
+    return changed
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from .scoring import Scoreboard
+from .store import ring
+
+logger = logging.getLogger(__name__)
+
+
+class Client:
+    """
+    A spectator socket. Only the newest frame is ever held for it: a writer
+    task sends whatever the board's current frame is when the socket is
+    ready, so intermediate states are skipped for slow clients.
+    """
+    def __init__(self, board, consumer):
+        self.board = board
+        self.consumer = consumer
+        self.sent = 0
+        self.behind_since = None
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def start(self):
+        self.wakeup.set()
+        self.task = asyncio.ensure_future(self.run())
+
+    async def run(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            version, frame = self.board.version, self.board.frame
+            if frame is None or version == self.sent:
+                continue
+            await self.consumer.send(text_data=frame)
+            self.sent = version
+            if self.sent == self.board.version:
+                self.behind_since = None
+
+    def notify(self, now):
+        if self.behind_since is None:
+            self.behind_since = now
+        elif now - self.behind_since > self.board.lag_limit:
+            return False
+        self.wakeup.set()
+        return True
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+
+class Board:
+    """
+    Per-process broadcaster for one scoreboard. It is the only member of
+    the board's channel layer group in this process, serialises each update
+    once and hands it to every spectator client.
+    """
+    refresh_interval = 3600
+
+    def __init__(self, sbid):
+        self.sbid = sbid
+        self.group = 'sb%d' % sbid
+        self.clients = set()
+        self.frame = None
+        self.version = 0
+        self.lag_limit = getattr(settings, 'SCORE_SPECTATOR_LAG', 5)
+        self.task = asyncio.ensure_future(self.run())
+
+    async def run(self):
+        layer = get_channel_layer(ring.node(self.sbid))
+        channel = await layer.new_channel()
+        try:
+            while True:
+                try:
+                    await layer.group_add(self.group, channel)
+                    if self.frame is None:
+                        scoreboard = await sync_to_async(Scoreboard)(self.sbid)
+                        if self.frame is None:
+                            self.publish(scoreboard.as_dict())
+                    # Wake up now and then to renew the group membership
+                    # before the layer's group expiry drops it.
+                    deadline = time.monotonic() + self.refresh_interval
+                    while time.monotonic() < deadline:
+                        try:
+                            message = await asyncio.wait_for(
+                                layer.receive(channel),
+                                deadline - time.monotonic(),
+                            )
+                        except asyncio.TimeoutError:
+                            break
+                        if message.get('type') == 'update':
+                            self.publish(message['data'])
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception('Spectator broadcaster for board %d failed, retrying', self.sbid)
+                    await asyncio.sleep(1)
+        finally:
+            try:
+                await layer.group_discard(self.group, channel)
+            except Exception:
+                pass
+
+    def publish(self, data):
+        self.frame = json.dumps(data)
+        self.version += 1
+        now = time.monotonic()
+        for client in list(self.clients):
+            if not client.notify(now):
+                logger.info('Dropping spectator of board %d lagging over %ss', self.sbid, self.lag_limit)
+                self.leave(client)
+                asyncio.ensure_future(client.consumer.close())
+
+    def join(self, consumer):
+        client = Client(self, consumer)
+        self.clients.add(client)
+        client.start()
+        return client
+
+    def leave(self, client):
+        client.stop()
+        self.clients.discard(client)
+        if not self.clients:
+            self.task.cancel()
+            if boards.get(self.sbid) is self:
+                del boards[self.sbid]
+
+
+boards = {}
+
+
+def get_board(sbid):
+    board = boards.get(sbid)
+    if board is None:
+        board = boards[sbid] = Board(sbid)
+    return board
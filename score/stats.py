@@ -0,0 +1,95 @@
+import time
+
+
+class MatchStats:
+    """
+    Running match statistics, updated in constant time per score change
+    and stored next to the scores. Nothing is recomputed from history:
+    rates and time in lead are derived from the running totals when the
+    stats are serialised.
+    """
+    def __init__(self, players, state=None):
+        state = state or {}
+        self.players = players
+        self.started = state.get('started')
+        self.points = list(state.get('points', [0] * players))
+        self.streak_pid = state.get('streak_pid')
+        self.streak = state.get('streak', 0)
+        self.longest = list(state.get('longest', [0] * players))
+        self.lead_changes = state.get('lead_changes', 0)
+        self.leader = state.get('leader')
+        self.last_leader = state.get('last_leader')
+        self.leader_since = state.get('leader_since')
+        self.lead_time = list(state.get('lead_time', [0.0] * players))
+
+    def state(self):
+        return {
+            'started': self.started,
+            'points': self.points,
+            'streak_pid': self.streak_pid,
+            'streak': self.streak,
+            'longest': self.longest,
+            'lead_changes': self.lead_changes,
+            'leader': self.leader,
+            'last_leader': self.last_leader,
+            'leader_since': self.leader_since,
+            'lead_time': self.lead_time,
+        }
+
+    def record(self, pid, delta, scores, now=None):
+        if now is None:
+            now = time.time()
+        if self.started is None:
+            self.started = now
+        self.points[pid] += delta
+
+        # Corrections (negative deltas) adjust the totals but neither extend
+        # nor break a streak.
+        if delta > 0:
+            if self.streak_pid == pid:
+                self.streak += 1
+            else:
+                self.streak_pid = pid
+                self.streak = 1
+            self.longest[pid] = max(self.longest[pid], self.streak)
+
+        leader = self._leader(scores)
+        if leader != self.leader:
+            if self.leader is not None:
+                self.lead_time[self.leader] += now - self.leader_since
+            if leader is not None:
+                if self.last_leader is not None and leader != self.last_leader:
+                    self.lead_changes += 1
+                self.last_leader = leader
+            self.leader = leader
+            self.leader_since = now
+
+    @staticmethod
+    def _leader(scores):
+        best = max(scores)
+        leaders = [pid for pid, score in enumerate(scores) if score == best]
+        return leaders[0] if len(leaders) == 1 else None
+
+    def as_dict(self, now=None):
+        if now is None:
+            now = time.time()
+        # Rates are taken over at least a minute, so the first few points of
+        # a match don't read as thousands per minute.
+        minutes = max((now - self.started) / 60, 1) if self.started is not None else 0
+        lead_time = list(self.lead_time)
+        if self.leader is not None:
+            lead_time[self.leader] += now - self.leader_since
+        return {
+            'points_per_minute': [
+                round(points / minutes, 2) if minutes else 0
+                for points in self.points
+            ],
+            'streak': {
+                'pid': self.streak_pid,
+                'length': self.streak,
+            },
+            'longest_streak': self.longest,
+            'lead_changes': self.lead_changes,
+            'leader': self.leader,
+            'time_in_lead': [round(seconds, 1) for seconds in lead_time],
+        }
@@ -0,0 +1,43 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Content-hashed static files with .gz and .br siblings written next to
+    each hashed file, for nginx's gzip_static/brotli_static to pick up.
+    """
+    compress_extensions = ('.css', '.js', '.svg', '.eot', '.ttf', '.json', '.txt')
+
+    def url(self, name, force=False):
+        # The Pi runs with DEBUG on, which would otherwise make templates
+        # link the unhashed names that nginx can't cache forever.
+        return super().url(name, force=True)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(self.compress_extensions):
+                self._compress(name)
+
+    def _compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        compressors = [('.gz', lambda data: gzip.compress(data, 9, mtime=0))]
+        if brotli is not None:
+            compressors.append(('.br', lambda data: brotli.compress(data, quality=11)))
+        for extension, compress in compressors:
+            compressed = compress(content)
+            if len(compressed) < len(content):
+                if self.exists(name + extension):
+                    self.delete(name + extension)
+                self._save(name + extension, ContentFile(compressed))
@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import caches
+
+from .sharding import HashRing
+
+logger = logging.getLogger(__name__)
+
+
+class Unavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name, threshold=None, reset_timeout=None):
+        self.name = name
+        self.threshold = threshold or getattr(settings, 'SCORE_BREAKER_THRESHOLD', 1)
+        self.reset_timeout = reset_timeout or getattr(settings, 'SCORE_BREAKER_RESET', 5)
+        self.failures = 0
+        self.opened_at = None
+        self.probe_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        # Once the reset timeout has passed a single trial call is let
+        # through, and everyone else keeps failing fast until it reports
+        # back; if it fails the breaker re-opens for another period. A
+        # probe that never reports back (e.g. cancelled) is replaced after
+        # another reset timeout.
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            if self.probe_at is not None and now - self.probe_at < self.reset_timeout:
+                return False
+            self.probe_at = now
+            return True
+
+    def success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                logger.warning('%s is reachable again', self.name)
+            self.failures = 0
+            self.opened_at = None
+            self.probe_at = None
+
+    def failure(self, exc):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold or self.probe_at is not None:
+                if self.opened_at is None:
+                    logger.warning('%s is unavailable, using local fallback: %r', self.name, exc)
+                self.opened_at = time.monotonic()
+                self.probe_at = None
+
+    def call(self, func, *args, **kwargs):
+        if not self.allow():
+            raise Unavailable(self.name)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as exc:
+            self.failure(exc)
+            raise Unavailable(self.name) from exc
+        self.success()
+        return result
+
+
+class StateStore:
+    """
+    Scoreboard state held in the cache, with an in-process copy that keeps
+    serving while the cache is unreachable. Every write bumps a version
+    stored next to the value; writes made during an outage are queued and
+    reconciled against the cache versions once it comes back.
+    """
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+        self.breaker = CircuitBreaker('cache %r' % alias)
+        self.local = {}
+        self.dirty = set()
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def version_key(key):
+        return '%s_v' % key
+
+    def get(self, key, default=None):
+        return self.get_many([key], default)[key]
+
+    def get_many(self, keys, default=None):
+        with self.lock:
+            self._resync()
+            wanted = [key for key in keys if key not in self.dirty]
+            if wanted:
+                try:
+                    remote = self.breaker.call(self.cache.get_many, [
+                        k for key in wanted for k in (key, self.version_key(key))
+                    ])
+                except Unavailable:
+                    pass
+                else:
+                    for key in wanted:
+                        self.local[key] = (
+                            remote.get(key, default),
+                            remote.get(self.version_key(key), 0),
+                        )
+            return {
+                key: self.local.get(key, (default, 0))[0]
+                for key in keys
+            }
+
+    def version(self, key):
+        return self.local.get(key, (None, 0))[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self._resync()
+            version = self.version(key) + 1
+            self.local[key] = (value, version)
+            try:
+                self.breaker.call(self.cache.set_many, {
+                    key: value,
+                    self.version_key(key): version,
+                }, timeout=None)
+            except Unavailable:
+                self.dirty.add(key)
+
+    def dump(self, keys):
+        """
+        Returns {key: (value, version)} for the keys that have a value,
+        reading through the cache when it is reachable.
+        """
+        self.get_many(keys)
+        with self.lock:
+            return {
+                key: self.local[key]
+                for key in keys
+                if self.local.get(key, (None, 0))[0] is not None
+            }
+
+    def load(self, items):
+        """
+        Bulk-writes {key: (value, version)}, keeping the given versions, in
+        one pipelined cache call.
+        """
+        with self.lock:
+            self._resync()
+            self.local.update(items)
+            data = {}
+            for key, (value, version) in items.items():
+                data[key] = value
+                data[self.version_key(key)] = version
+            try:
+                self.breaker.call(self.cache.set_many, data, timeout=None)
+            except Unavailable:
+                self.dirty.update(items)
+
+    def _resync(self):
+        # The first call below is the breaker's probe while it is half-open
+        if not self.dirty:
+            return
+        keys = list(self.dirty)
+        try:
+            remote = self.breaker.call(self.cache.get_many, [self.version_key(key) for key in keys])
+            updates = {}
+            for key in keys:
+                value, version = self.local[key]
+                if remote.get(self.version_key(key), 0) < version:
+                    updates[key] = value
+                    updates[self.version_key(key)] = version
+            self.breaker.call(self.cache.set_many, updates, timeout=None)
+        except Unavailable:
+            return
+        # Keys where the cache holds a newer version are simply dropped from
+        # the local copy, so the next read picks up the remote value.
+        for key in keys:
+            if key not in updates:
+                del self.local[key]
+        self.dirty.clear()
+        logger.warning('Reconciled %d queued scoreboard writes', len(updates) // 2)
+
+
+class Groups:
+    """
+    Channel layer group operations bounded by a timeout and guarded by a
+    circuit breaker, so that a stalled channel layer never blocks a request.
+    Failures are logged and swallowed; callers learn of them through the
+    return value.
+    """
+    def __init__(self, alias='default'):
+        self.alias = alias
+        self.breaker = CircuitBreaker('channel layer %r' % alias)
+        self.timeout = getattr(settings, 'SCORE_CHANNEL_TIMEOUT', 0.25)
+
+    async def _call(self, method, *args):
+        if not self.breaker.allow():
+            return False
+        try:
+            await asyncio.wait_for(
+                getattr(get_channel_layer(self.alias), method)(*args),
+                self.timeout,
+            )
+        except Exception as exc:
+            self.breaker.failure(exc)
+            return False
+        self.breaker.success()
+        return True
+
+    async def send(self, group, message):
+        return await self._call('group_send', group, message)
+
+    async def add(self, group, channel):
+        return await self._call('group_add', group, channel)
+
+    async def discard(self, group, channel):
+        return await self._call('group_discard', group, channel)
+
+    def send_sync(self, group, message):
+        return async_to_sync(self.send)(group, message)
+
+
+# Boards are spread over the shards by scoreboard id; each shard name is
+# both a CACHES and a CHANNEL_LAYERS alias.
+ring = HashRing(getattr(settings, 'SCORE_SHARDS', ['default']))
+stores = {alias: StateStore(alias) for alias in ring.nodes}
+channel_groups = {alias: Groups(alias) for alias in ring.nodes}
+
+
+def get_store(sbid):
+    return stores[ring.node(sbid)]
+
+
+def get_groups(sbid):
+    return channel_groups[ring.node(sbid)]
@@ -0,0 +1,417 @@
+import asyncio
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from channels.exceptions import ChannelFull
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from gpiozero.pins.mock import MockFactory
+
+from .admission import Admission
+from .buttons import ButtonWorker, setup_buttons
+from .framebuffer import FrameBuffer
+from .hardware import DigitDisplay
+from .layers import LocalChannelLayer
+from .management.commands.displayd import DisplayDaemon
+from .scoring import Scoreboard
+from .sharding import HashRing
+from .snapshot import FORMAT, export_records, export_snapshot, import_snapshot
+from .stats import MatchStats
+from .store import CircuitBreaker, StateStore
+
+
+class MatchStatsTests(SimpleTestCase):
+    def play(self, stats, scores, events, start=0):
+        for i in range(start, start + events):
+            pid = (i // 3) % 2
+            scores[pid] += 1
+            stats.record(pid, 1, scores, now=i)
+
+    def time_events(self, history, events=2000):
+        stats = MatchStats(2)
+        scores = [0, 0]
+        self.play(stats, scores, history)
+        best = None
+        for attempt in range(3):
+            started = time.perf_counter()
+            self.play(stats, scores, events, start=history + attempt * events)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def test_constant_cost_per_event(self):
+        short = self.time_events(1000)
+        long = self.time_events(100000)
+        # A cost growing with history would make this ~100 times slower
+        self.assertLess(long, short * 3)
+
+    def test_state_does_not_grow_with_history(self):
+        stats = MatchStats(2)
+        self.play(stats, [0, 0], 1000)
+        size = len(repr(stats.state()))
+        self.play(stats, [1000, 1000], 100000, start=1000)
+        # Only the numbers get longer, never the number of entries
+        self.assertLess(len(repr(stats.state())), size * 2)
+
+    def test_streaks_and_lead(self):
+        stats = MatchStats(2)
+        scores = [0, 0]
+        for now, pid in enumerate([0, 0, 1, 1, 1, 0]):
+            scores[pid] += 1
+            stats.record(pid, 1, scores, now=now * 10)
+        result = stats.as_dict(now=60)
+        self.assertEqual(result['streak'], {'pid': 0, 'length': 1})
+        self.assertEqual(result['longest_streak'], [2, 3])
+        self.assertEqual(result['lead_changes'], 1)
+        self.assertIsNone(result['leader'])
+        self.assertEqual(result['time_in_lead'], [30, 10])
+
+    def test_points_per_minute_over_at_least_a_minute(self):
+        stats = MatchStats(2)
+        stats.record(0, 5, [5, 0], now=100)
+        self.assertEqual(stats.as_dict(now=101)['points_per_minute'], [5, 0])
+        self.assertEqual(stats.as_dict(now=220)['points_per_minute'], [2.5, 0])
+
+    def test_corrections_keep_the_streak(self):
+        stats = MatchStats(2)
+        stats.record(0, 1, [1, 0], now=0)
+        stats.record(0, 1, [2, 0], now=1)
+        stats.record(0, -1, [1, 0], now=2)
+        self.assertEqual(stats.as_dict(now=3)['streak'], {'pid': 0, 'length': 2})
+        self.assertEqual(stats.points, [1, 0])
+
+
+@override_settings(
+    CACHES={
+        'a': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'snapshot-a'},
+        'b': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'snapshot-b'},
+    },
+    SCORE_BOARDS={1: {'players': 1}, 4: {'digits': 3}},
+    SCORE_ADMIN_TOKEN='secret',
+)
+class SnapshotTests(SimpleTestCase):
+    boards = 6
+
+    def setUp(self):
+        # Several boards over two shards, read and written a few at a time
+        ring = HashRing(['a', 'b'])
+        self.stores = {alias: StateStore(alias) for alias in ring.nodes}
+        for store in self.stores.values():
+            store.cache.clear()
+        get_store = lambda sbid: self.stores[ring.node(sbid)]
+        for patcher in (
+            mock.patch.object(Scoreboard, 'max_scoreboards', self.boards),
+            mock.patch.object(Scoreboard, 'broadcast'),
+            mock.patch('score.scoring.get_store', get_store),
+            mock.patch('score.snapshot.get_store', get_store),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for sbid in range(self.boards):
+            for pid, player in enumerate(Scoreboard(sbid).players):
+                player + (sbid + pid + 1)
+
+    def scores(self):
+        return [
+            [player.score for player in Scoreboard(sbid).players]
+            for sbid in range(self.boards)
+        ]
+
+    def test_round_trip(self):
+        expected = self.scores()
+        records = list(export_records(chunk_size=4))
+        self.assertEqual(records[0]['format'], FORMAT)
+        self.assertEqual(sorted(record['sbid'] for record in records[1:]), list(range(self.boards)))
+        # A one-player board has one score key next to its stats
+        board = next(record for record in records[1:] if record['sbid'] == 1)
+        self.assertEqual(sorted(board['state']), ['sb1_p0', 'sb1_stats'])
+
+        for store in self.stores.values():
+            store.cache.clear()
+            store.local.clear()
+        self.assertEqual(import_snapshot(iter(records[1:]), chunk_size=4), [record['sbid'] for record in records[1:]])
+        self.assertEqual(self.scores(), expected)
+        # Versions are kept, so loading the same snapshot again is a no-op
+        self.assertEqual(import_snapshot(iter(records[1:])), [])
+
+    def test_post_loads_into_server(self):
+        data = b''.join(export_snapshot())
+        Scoreboard(3)[0] + 5
+        post = lambda data, **headers: self.client.post('/snapshot', data, content_type='application/gzip', **headers)
+        self.assertEqual(post(data).status_code, 403)
+        self.assertEqual(post(data, HTTP_X_SCORE_TOKEN='guess').status_code, 403)
+        self.assertEqual(Scoreboard(3)[0].score, 9)
+        self.assertEqual(post(data, HTTP_X_SCORE_TOKEN='secret').json(), {'changed': [3]})
+        self.assertEqual(Scoreboard(3)[0].score, 4)
+        self.assertEqual(post(b'junk', HTTP_X_SCORE_TOKEN='secret').status_code, 400)
+        self.assertEqual(post(gzip.compress(b''), HTTP_X_SCORE_TOKEN='secret').status_code, 400)
+
+    def test_unknown_board_changes_nothing(self):
+        records = list(export_records())
+        Scoreboard(0)[0] + 5
+        records.append({'sbid': self.boards, 'config': {}, 'state': {'sb%d_p0' % self.boards: [1, 1]}})
+        data = gzip.compress(b''.join(json.dumps(record).encode() + b'\n' for record in records))
+        response = self.client.post('/snapshot', data, content_type='application/gzip', HTTP_X_SCORE_TOKEN='secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Scoreboard(0)[0].score, 6)
+
+
+class AdmissionTests(SimpleTestCase):
+    def setUp(self):
+        self.applied = []
+        self.reset = []
+        self.admission = Admission(
+            lambda *change: self.applied.append(change), self.reset.append, rate=50, burst=1,
+        )
+
+    def test_merges_taps_over_the_rate(self):
+        self.assertTrue(self.admission.submit('a', 0, 0, 1))
+        for i in range(5):
+            self.assertFalse(self.admission.submit('a', 0, 0, 1))
+        time.sleep(0.2)
+        self.assertEqual(self.applied, [(0, 0, 1), (0, 0, 5)])
+
+    def test_reset_drops_pending_taps(self):
+        self.admission.submit('a', 0, 0, 1)
+        for i in range(5):
+            self.admission.submit('a', 0, 0, 1)
+            self.admission.submit('a', 1, 0, 1)
+        self.admission.reset(0)
+        time.sleep(0.2)
+        self.assertEqual(self.reset, [0])
+        self.assertEqual(self.applied, [(0, 0, 1), (1, 0, 5)])
+
+
+@override_settings(SCORE_BUTTON_BOUNCE=None, SCORE_BUTTON_REPEAT=0.05)
+class ButtonTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = MockFactory()
+        self.worker = ButtonWorker()
+        self.worker.start()
+        self.buttons = setup_buttons(
+            [(5, 'increase', 0, 1, 2), (6, 'reset', 0)], self.worker, pin_factory=self.factory,
+        )
+        for button in self.buttons:
+            self.addCleanup(button.close)
+        self.addCleanup(self.worker.stop)
+
+    def press(self, pin, seconds=0.01):
+        self.factory.pin(pin).drive_low()
+        time.sleep(seconds)
+        self.factory.pin(pin).drive_high()
+
+    def drain(self):
+        # Stopping queues behind every press so far and waits for them
+        self.worker.stop()
+
+    @mock.patch('score.buttons.admission')
+    @mock.patch('score.buttons.change_score')
+    def test_press_and_reset(self, change_score, admission):
+        self.press(5)
+        self.press(6)
+        self.drain()
+        change_score.assert_called_once_with(0, 1, 2)
+        admission.reset.assert_called_once_with(0)
+
+    @mock.patch('score.buttons.change_score')
+    def test_hold_repeats(self, change_score):
+        self.press(5, seconds=0.3)
+        self.drain()
+        self.assertGreaterEqual(change_score.call_count, 3)
+        for call in change_score.call_args_list:
+            self.assertEqual(call, mock.call(0, 1, 2))
+
+    @override_settings(CACHES={
+        'buttons': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'buttons'},
+    })
+    def test_press_to_display_latency(self):
+        store = StateStore('buttons')
+        store.cache.clear()
+        shown = []
+        with mock.patch('score.scoring.get_store', lambda sbid: store), \
+                mock.patch('score.scoring.get_groups'), \
+                mock.patch('score.scoring.set_display', lambda *args: shown.append(time.perf_counter())):
+            latencies = []
+            for i in range(20):
+                pressed = time.perf_counter()
+                self.press(5, seconds=0)
+                deadline = pressed + 1
+                while len(shown) <= i and time.perf_counter() < deadline:
+                    time.sleep(0.0005)
+                self.assertEqual(len(shown), i + 1)
+                latencies.append(shown[i] - pressed)
+            self.drain()
+        self.assertEqual(store.get('sb0_p1'), 40)
+        latencies.sort()
+        self.assertLess(latencies[len(latencies) // 2], 0.05)
+
+
+class DisplayDaemonTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'display.fb')
+        self.display = DigitDisplay(pin_factory=MockFactory())
+        self.framebuffer = FrameBuffer(self.path)
+        self.addCleanup(self.framebuffer.close)
+        self.daemon = DisplayDaemon(self.display, self.framebuffer)
+        self.addCleanup(self.daemon.listener.close)
+
+    def test_shows_written_frames(self):
+        writer = FrameBuffer(self.path)
+        self.addCleanup(writer.close)
+        writer.write('1234')
+        self.daemon.run_once(timeout=1)
+        self.assertEqual(self.display.value, '1234')
+        writer.write('0907')
+        self.daemon.run_once(timeout=1)
+        self.assertEqual(self.display.value, '0907')
+
+    def test_recovers_from_a_dead_writer(self):
+        self.framebuffer.write('1234')
+        # A writer that died between its two header updates
+        sequence = self.framebuffer.sequence
+        FrameBuffer.header.pack_into(self.framebuffer.map, 0, sequence + 1, 0)
+        self.assertEqual(self.framebuffer.read(), (sequence + 1, ''))
+        self.framebuffer.write('5678')
+        self.assertEqual(self.framebuffer.read(), (sequence + 2, '5678'))
+
+
+@override_settings(CACHES={
+    'store': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'store'},
+})
+class StateStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.store = StateStore('store')
+        self.store.cache.clear()
+        self.store.breaker = CircuitBreaker('test', threshold=1, reset_timeout=0.05)
+        # The breaker and reconciliation log at warning level
+        logs = self.assertLogs('score.store', 'WARNING')
+        logs.__enter__()
+        self.addCleanup(logs.__exit__, None, None, None)
+
+    def outage(self):
+        error = mock.Mock(side_effect=ConnectionError)
+        return mock.patch.multiple(self.store.cache, get_many=error, set_many=error)
+
+    def recover(self):
+        time.sleep(0.06)
+
+    def test_dirty_write_is_pushed_back(self):
+        self.store.set('k', 1)
+        with self.outage():
+            self.store.set('k', 2)
+            self.assertEqual(self.store.get('k'), 2)
+        self.assertEqual(self.store.cache.get('k'), 1)
+        self.recover()
+        self.assertEqual(self.store.get('k'), 2)
+        self.assertEqual(self.store.cache.get_many(['k', 'k_v']), {'k': 2, 'k_v': 2})
+        self.assertFalse(self.store.dirty)
+
+    def test_newer_remote_version_wins(self):
+        self.store.set('k', 1)
+        with self.outage():
+            self.store.set('k', 2)
+        # Another worker wrote twice while this one was cut off
+        self.store.cache.set_many({'k': 5, 'k_v': 3})
+        self.recover()
+        self.assertEqual(self.store.get('k'), 5)
+        self.assertEqual(self.store.version('k'), 3)
+        self.assertEqual(self.store.cache.get('k'), 5)
+
+    def test_half_open_lets_one_probe_through(self):
+        breaker = self.store.breaker
+        breaker.failure(ConnectionError())
+        self.assertFalse(breaker.allow())
+        self.recover()
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.failure(ConnectionError())
+        self.assertFalse(breaker.allow())
+        self.recover()
+        self.assertTrue(breaker.allow())
+        breaker.success()
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+
+class LocalChannelLayerTests(SimpleTestCase):
+    def test_full_queue_drops_oldest(self):
+        async def run():
+            layer = LocalChannelLayer(capacity=2)
+            channel = await layer.new_channel()
+            await layer.group_add('sb0', channel)
+            for n in range(3):
+                await layer.group_send('sb0', {'type': 'update', 'n': n})
+            received = [(await layer.receive(channel))['n'] for n in range(2)]
+            # Direct sends are not updates that supersede each other
+            await layer.send(channel, {'type': 'update'})
+            await layer.send(channel, {'type': 'update'})
+            with self.assertRaises(ChannelFull):
+                await layer.send(channel, {'type': 'update'})
+            return received, layer.dropped
+        self.assertEqual(asyncio.run(run()), ([1, 2], 1))
+
+    def test_stalled_channels_expire(self):
+        async def run():
+            layer = LocalChannelLayer(expiry=0.05)
+            gone, alive = await layer.new_channel(), await layer.new_channel()
+            await layer.group_add('sb0', gone)
+            await layer.group_send('sb0', {'type': 'update'})
+            await asyncio.sleep(0.1)
+            await layer.group_add('sb0', alive)
+            await layer.group_send('sb0', {'type': 'update'})
+            return layer.groups, set(layer.channels)
+        groups, channels = asyncio.run(run())
+        self.assertEqual(list(groups['sb0']), [channels.pop()])
+        self.assertFalse(channels)
+
+    def test_send_from_another_thread_wakes_receiver(self):
+        layer = LocalChannelLayer()
+
+        async def run():
+            channel = await layer.new_channel()
+            await layer.group_add('sb0', channel)
+            sender = threading.Timer(0.05, asyncio.run, (layer.group_send('sb0', {'type': 'update'}),))
+            sender.start()
+            message = await asyncio.wait_for(layer.receive(channel), 1)
+            sender.join()
+            return message
+        self.assertEqual(asyncio.run(run()), {'type': 'update'})
+
+
+@override_settings(CACHES={
+    'a': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'reshard-a'},
+    'b': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'reshard-b'},
+})
+class ReshardTests(SimpleTestCase):
+    boards = 20
+
+    def test_moves_boards_to_new_shard(self):
+        old = {'a': StateStore('a')}
+        new = {'a': old['a'], 'b': StateStore('b')}
+        for store in new.values():
+            store.cache.clear()
+        for sbid in range(self.boards):
+            old['a'].set('sb%d_p0' % sbid, sbid)
+        # Written on its new shard since, and kept
+        new['b'].set('sb2_p0', 42)
+        new['b'].set('sb2_p0', 43)
+
+        new_ring = HashRing(['a', 'b'])
+        with mock.patch.object(Scoreboard, 'max_scoreboards', self.boards), \
+                mock.patch('score.management.commands.reshard.ring', new_ring), \
+                mock.patch('score.management.commands.reshard.stores', new):
+            call_command('reshard', 'a', stdout=io.StringIO())
+
+        moved = [sbid for sbid in range(self.boards) if new_ring.node(sbid) == 'b']
+        self.assertIn(2, moved)
+        self.assertTrue(0 < len(moved) < self.boards)
+        for sbid in moved:
+            self.assertEqual(new['b'].get('sb%d_p0' % sbid), 43 if sbid == 2 else sbid)
@@ -0,0 +1,105 @@
+import contextvars
+import cProfile
+import functools
+import logging
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('score_trace', default=None)
+
+
+class Trace:
+    def __init__(self):
+        self.spans = []
+        self.depth = 0
+
+    def run(self, name, func, args, kwargs):
+        start = time.perf_counter()
+        self.depth += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.depth -= 1
+            self.spans.append((start, self.depth, name, time.perf_counter() - start))
+
+    def format(self):
+        return ' | '.join(
+            '%s%s %.2fms' % ('.' * depth, name, duration * 1000)
+            for start, depth, name, duration in sorted(self.spans)
+        )
+
+
+class Profiler:
+    """
+    Counts down the number of upcoming traced requests to run under
+    cProfile. The count is per worker process.
+    """
+    def __init__(self):
+        self.remaining = 0
+        self.lock = threading.Lock()
+
+    def arm(self, requests):
+        with self.lock:
+            self.remaining = requests
+
+    def take(self):
+        with self.lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def dump(self, profile, name):
+        directory = settings.SCORE_PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, '%d-%s-%d.prof' % (time.time() * 1000, name, os.getpid()))
+        profile.dump_stats(path)
+        logger.info('Wrote profile %s', path)
+
+
+profiler = Profiler()
+
+
+def _run_root(name, func, args, kwargs):
+    profile = profiler.take()
+    if not profile and random.random() >= getattr(settings, 'SCORE_TRACE_SAMPLE_RATE', 0):
+        return func(*args, **kwargs)
+
+    trace = Trace()
+    token = _current.set(trace)
+    profile = cProfile.Profile() if profile else None
+    try:
+        if profile is not None:
+            profile.enable()
+        return trace.run(name, func, args, kwargs)
+    finally:
+        if profile is not None:
+            profile.disable()
+            profiler.dump(profile, name)
+        _current.reset(token)
+        logger.info('trace %s', trace.format())
+
+
+def traced(name, root=False):
+    """
+    Time the decorated function as a span of the current trace. A root
+    span starts a new trace for a sampled fraction of calls (or when
+    profiling has been armed); other spans only record inside one.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current.get()
+            if trace is not None:
+                return trace.run(name, func, args, kwargs)
+            if root:
+                return _run_root(name, func, args, kwargs)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -7,4 +7,7 @@ urlpatterns = [
     path('incr/<int:sbid>/<int:pid>/<int:amount>', views.IncreaseScore.as_view(), name='increase'),
     path('decr/<int:sbid>/<int:pid>/<int:amount>', views.DecreaseScore.as_view(), name='decrease'),
     path('reset/<int:sbid>', views.Reset.as_view(), name='reset'),
+    path('profile/<int:requests>', views.Profile.as_view(), name='profile'),
+    path('metrics', views.Metrics.as_view(), name='metrics'),
+    path('snapshot', views.Snapshot.as_view(), name='snapshot'),
 ]
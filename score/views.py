@@ -1,33 +1,95 @@
-from django.http import HttpResponse
+import hmac
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.views import View
 from django.views.generic import TemplateView
 
+from .admission import admission
 from .scoring import Scoreboard
+from .snapshot import export_snapshot, load_snapshot
+from .tracing import profiler, traced
+
+
+def check_admin(request):
+    # Behind the proxy every request comes from loopback, so only the token
+    # counts
+    token = getattr(settings, 'SCORE_ADMIN_TOKEN', None)
+    if token and hmac.compare_digest(request.headers.get('X-Score-Token', ''), token):
+        return
+    raise PermissionDenied
+
+
+def submit_tap(request, sbid, pid, delta):
+    if sbid >= Scoreboard.max_scoreboards or pid >= Scoreboard.config(sbid).get('players', 2):
+        raise Http404
+    if admission.submit(request.META.get('REMOTE_ADDR'), sbid, pid, delta):
+        return HttpResponse()
+    # Over the client's rate: merged into a pending change applied shortly
+    return HttpResponse(status=202)
 
 
 class IncreaseScore(View):
+    @traced('IncreaseScore', root=True)
     def post(self, request, sbid, pid, amount):
-        sb = Scoreboard(sbid)
-        sb[pid] + amount
-        return HttpResponse()
+        return submit_tap(request, sbid, pid, amount)
 
 
 class DecreaseScore(View):
+    @traced('DecreaseScore', root=True)
     def post(self, request, sbid, pid, amount):
-        sb = Scoreboard(sbid)
-        sb[pid] - amount
-        return HttpResponse()
+        return submit_tap(request, sbid, pid, -amount)
 
 
 class Reset(View):
+    @traced('Reset', root=True)
     def post(self, request, sbid):
-        sb = Scoreboard(sbid)
-        sb.reset()
+        if sbid >= Scoreboard.max_scoreboards:
+            raise Http404
+        admission.reset(sbid)
         return HttpResponse()
 
 
+class Profile(View):
+    # Profiles the next few traced requests handled by this worker process
+    # into SCORE_PROFILE_DIR; disabled unless that setting is configured.
+    def post(self, request, requests):
+        if not getattr(settings, 'SCORE_PROFILE_DIR', None):
+            raise Http404
+        check_admin(request)
+        profiler.arm(min(requests, getattr(settings, 'SCORE_PROFILE_MAX_REQUESTS', 50)))
+        return HttpResponse()
+
+
+class Metrics(View):
+    def get(self, request):
+        return JsonResponse({
+            'admission': admission.metrics(),
+        })
+
+
+class Snapshot(View):
+    # Read from the primary and written to the standby's own server by
+    # `manage.py loadboards`
+    def get(self, request):
+        # Built here, in the view's thread: a streaming body would be read
+        # from the cache on the server's event loop
+        response = HttpResponse(b''.join(export_snapshot()), content_type='application/gzip')
+        response['Content-Disposition'] = 'attachment; filename="scoreboards.jsonl.gz"'
+        return response
+
+    def post(self, request):
+        check_admin(request)
+        try:
+            changed = load_snapshot(request)
+        except (OSError, EOFError, ValueError, KeyError, TypeError) as exc:
+            return HttpResponseBadRequest('Invalid snapshot: %s' % exc)
+        return JsonResponse({'changed': changed})
+
+
 class Home(TemplateView):
     template_name = 'score/home.html'
 